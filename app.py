@@ -1,71 +1,123 @@
 from flask import Flask, jsonify, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-import requests
+from flask_caching import Cache
+from cachetools import TTLCache
+import httpx
 from datetime import datetime, timedelta
-import json
+import orjson
 import os
+import tempfile
+import threading
+import time
 from pathlib import Path
-from scrapers import scrape_all_sources
+from apscheduler.schedulers.background import BackgroundScheduler
 from database import get_upcoming_events, init_db, get_scraping_stats
+from scraper_job import run_scraper
+
+class OrjsonProvider(JSONProvider):
+    """Serialize jsonify() responses with orjson instead of the stdlib json module"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__, static_folder='.')
+app.json = OrjsonProvider(app)
 CORS(app)
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
 
-# Prospect Heights coordinates
-PROSPECT_HEIGHTS = {
-    'lat': 40.6782,
-    'lng': -73.9712
-}
+# Scraping runs in the background; requests only ever read the database
+scheduler = BackgroundScheduler(daemon=True)
+
+# Shared HTTP client so API fetchers reuse keep-alive connections
+# instead of paying a TCP+TLS handshake per request
+_client = httpx.Client(
+    timeout=10.0,
+    follow_redirects=True,  # requests' default; httpx doesn't follow them otherwise
+    transport=httpx.HTTPTransport(
+        http2=True, retries=3,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    )
+)
 
 # Cache file path
 CACHE_FILE = 'events_cache.json'
 CACHE_DURATION = timedelta(hours=1)
 
+# Decoded events kept in process memory so cache hits skip the file entirely
+_memory_cache = TTLCache(maxsize=1, ttl=CACHE_DURATION.total_seconds())
+# TTLCache isn't thread-safe and gunicorn serves requests from a thread pool
+_memory_cache_lock = threading.Lock()
+# Serializes background writes of the cache file within this process
+_cache_file_lock = threading.Lock()
+
 def load_cache():
     """Load events from cache if available and not expired"""
-    if not os.path.exists(CACHE_FILE):
+    with _memory_cache_lock:
+        events = _memory_cache.get('events')
+    if events is not None:
+        return events
+    
+    try:
+        # Every save rewrites the file, so an old mtime means stale contents
+        st = os.stat(CACHE_FILE)
+    except FileNotFoundError:
+        return None
+    if time.time() - st.st_mtime >= CACHE_DURATION.total_seconds():
         return None
     
     try:
-        with open(CACHE_FILE, 'r') as f:
-            cache_data = json.load(f)
+        with open(CACHE_FILE, 'rb') as f:
+            cache_data = orjson.loads(f.read())
         
         cache_time = datetime.fromisoformat(cache_data['timestamp'])
         if datetime.now() - cache_time < CACHE_DURATION:
-            return cache_data['events']
+            events = cache_data['events']
+            # Keep the decoded events so later calls skip the file again
+            with _memory_cache_lock:
+                _memory_cache['events'] = events
+            return events
     except Exception as e:
         print(f"Error loading cache: {e}")
     
     return None
 
 def save_cache(events):
-    """Save events to cache"""
+    """Save events to cache, writing the cache file in the background"""
+    with _memory_cache_lock:
+        _memory_cache['events'] = events
+    threading.Thread(target=_write_cache_file, args=(events,), daemon=True).start()
+
+def _write_cache_file(events):
+    """Persist events to the cache file, replacing it atomically"""
     try:
         cache_data = {
             'timestamp': datetime.now().isoformat(),
             'events': events
         }
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(cache_data, f, indent=2)
+        # Compact output; the cache file isn't meant to be read by humans
+        data = orjson.dumps(cache_data, option=orjson.OPT_SERIALIZE_NUMPY)
+        
+        # Write a sibling temp file and rename it over the cache, so readers
+        # (and overlapping saves) never see a partially written file
+        with _cache_file_lock:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(CACHE_FILE)),
+                prefix='.events_cache.', suffix='.tmp'
+            )
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, CACHE_FILE)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
     except Exception as e:
         print(f"Error saving cache: {e}")
 
-def calculate_distance(lat1, lng1, lat2, lng2):
-    """Calculate distance between two coordinates using Haversine formula"""
-    from math import radians, sin, cos, sqrt, atan2
-    
-    R = 3959  # Earth's radius in miles
-    
-    lat1_rad = radians(lat1)
-    lat2_rad = radians(lat2)
-    delta_lat = radians(lat2 - lat1)
-    delta_lng = radians(lng2 - lng1)
-    
-    a = sin(delta_lat/2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(delta_lng/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    
-    return R * c
-
 def fetch_nyc_government_events():
     """Fetch events from NYC Open Data (example API)"""
     events = []
@@ -73,6 +125,7 @@ def fetch_nyc_government_events():
     # TODO: Implement NYC Open Data API integration
     # NYC Open Data: https://opendata.cityofnewyork.us/
     # Events API: https://data.cityofnewyork.us/browse?tags=events
+    # Fetch through _client.get(url) to reuse pooled connections
     
     return events
 
@@ -85,10 +138,36 @@ def fetch_external_api_events():
     # - Facebook Events API: https://developers.facebook.com/docs/graph-api
     # - Meetup API: https://www.meetup.com/meetup_api/
     # Note: These APIs require authentication keys
+    # Fetch through _client.get(url) to reuse pooled connections
     
     return events
 
+def start_scheduler():
+    """Scrape once now, then hourly, while requests keep serving current rows"""
+    scheduler.add_job(
+        run_scraper, 'interval', hours=1,
+        id='scraper', replace_existing=True,
+        next_run_time=datetime.now(),
+        max_instances=1, coalesce=True
+    )
+    scheduler.start()
+
+# The scraper writes from another process, so nothing can invalidate the
+# per-worker response cache; keep it short so new rows show up within minutes
+API_EVENTS_CACHE_TIMEOUT = 300
+
+def _cacheable_events_response(rv):
+    """Only cache successful /api/events responses that contain events"""
+    # Error responses are (body, status) tuples; an empty list usually means
+    # the first scrape hasn't finished yet, so don't pin it either
+    return not isinstance(rv, tuple) and bool(rv.json['events'])
+
 @app.route('/api/events')
+@cache.cached(
+    timeout=API_EVENTS_CACHE_TIMEOUT,
+    key_prefix='api_events',
+    response_filter=_cacheable_events_response
+)
 def get_events():
     """API endpoint to get aggregated events from database"""
     
@@ -96,13 +175,6 @@ def get_events():
         # Get events from database
         events = get_upcoming_events(limit=100)
         
-        # Convert datetime objects to ISO strings for JSON serialization
-        for event in events:
-            if 'created_at' in event:
-                del event['created_at']
-            if 'updated_at' in event:
-                del event['updated_at']
-        
         return jsonify({'events': events})
     except Exception as e:
         print(f"Error fetching events from database: {e}")
@@ -127,9 +199,12 @@ def serve_static(path):
     """Serve static files"""
     return send_from_directory('.', path)
 
+# Initialize database at import so gunicorn workers get the schema too
+init_db()
+
 if __name__ == '__main__':
-    # Initialize database
-    init_db()
+    start_scheduler()
     
-    app.run(debug=True, port=5001)
+    # Development server; use gunicorn (see gunicorn.conf.py) in production
+    app.run(port=5001)
 
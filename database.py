@@ -3,31 +3,55 @@ Database management for Brooklyn Events Aggregator
 Uses SQLite for simplicity, but can be migrated to PostgreSQL/MySQL easily
 """
 import sqlite3
+import os
+import threading
 from datetime import datetime, timedelta
 from contextlib import contextmanager
 import json
 
 DB_FILE = 'events.db'
 
+# One connection per thread, reused across calls to get_db()
+_tls = threading.local()
+
+def _get_connection():
+    """Return this thread's connection, opening it on first use"""
+    conn = getattr(_tls, 'conn', None)
+    
+    # A connection must not be used across a fork (e.g. gunicorn master -> worker)
+    if conn is None or _tls.pid != os.getpid():
+        conn = sqlite3.connect(DB_FILE)
+        conn.row_factory = sqlite3.Row
+        # Per-connection settings; WAL makes NORMAL sync safe against corruption
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        # Read through a 256MB memory map and keep ~20MB of pages cached
+        conn.execute('PRAGMA mmap_size=268435456')
+        conn.execute('PRAGMA cache_size=-20000')
+        _tls.conn = conn
+        _tls.pid = os.getpid()
+    
+    return conn
+
 @contextmanager
 def get_db():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
+    """Context manager for database connections (one transaction per block)"""
+    conn = _get_connection()
     try:
         yield conn
         conn.commit()
     except Exception as e:
         conn.rollback()
         raise e
-    finally:
-        conn.close()
 
 def init_db():
     """Initialize the database with required tables"""
     with get_db() as conn:
         cursor = conn.cursor()
         
+        # WAL is persistent, so it only needs to be set once per database file
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Events table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS events (
@@ -50,8 +74,11 @@ def init_db():
         ''')
         
         # Create indexes for better query performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_date ON events(date)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_type ON events(type)')
+        # (date, type) serves the upcoming-events filter and its ORDER BY date
+        # without a sort; single-column date/type indexes are redundant with it
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_date_type ON events(date, type)')
+        cursor.execute('DROP INDEX IF EXISTS idx_date')
+        cursor.execute('DROP INDEX IF EXISTS idx_type')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_source ON events(source)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_distance ON events(distance)')
         
@@ -71,79 +98,106 @@ def init_db():
         
         print("Database initialized successfully")
 
-def insert_event(event):
-    """Insert or update an event in the database"""
+UPSERT_EVENT_SQL = '''
+    INSERT INTO events 
+    (title, description, date, location, latitude, longitude, 
+     distance, type, url, source, source_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(source, source_id) DO UPDATE SET
+        title = excluded.title, description = excluded.description,
+        date = excluded.date, location = excluded.location,
+        latitude = excluded.latitude, longitude = excluded.longitude,
+        distance = excluded.distance, type = excluded.type,
+        url = excluded.url, updated_at = CURRENT_TIMESTAMP
+'''
+
+def _event_params(event):
+    """Build the UPSERT_EVENT_SQL parameter tuple for an event"""
+    return (
+        event.get('title'),
+        event.get('description'),
+        event.get('date'),
+        event.get('location'),
+        event.get('latitude'),
+        event.get('longitude'),
+        event.get('distance'),
+        event.get('type'),
+        event.get('url'),
+        event.get('source'),
+        event.get('source_id')
+    )
+
+# NOT NULL columns of the events table (besides the generated ones)
+REQUIRED_EVENT_FIELDS = ('title', 'location', 'type', 'source')
+
+def insert_events_bulk(events):
+    """Insert or update many events in a single transaction; returns the number of rows written"""
+    # One bad row would roll back the whole batch, so drop invalid events up front
+    params = []
+    for event in events:
+        missing = [field for field in REQUIRED_EVENT_FIELDS if event.get(field) is None]
+        if missing:
+            print(f"Skipping event missing {', '.join(missing)}: {event.get('title', 'Unknown')}")
+            continue
+        params.append(_event_params(event))
+    
     with get_db() as conn:
         cursor = conn.cursor()
+        cursor.executemany(UPSERT_EVENT_SQL, params)
+        rowcount = cursor.rowcount
         
-        # Try to update existing event first
-        cursor.execute('''
-            UPDATE events 
-            SET title = ?, description = ?, date = ?, location = ?,
-                latitude = ?, longitude = ?, distance = ?, type = ?,
-                url = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE source = ? AND source_id = ?
-        ''', (
-            event.get('title'),
-            event.get('description'),
-            event.get('date'),
-            event.get('location'),
-            event.get('latitude'),
-            event.get('longitude'),
-            event.get('distance'),
-            event.get('type'),
-            event.get('url'),
-            event.get('source'),
-            event.get('source_id')
-        ))
-        
-        # If no rows were updated, insert new event
-        if cursor.rowcount == 0:
-            cursor.execute('''
-                INSERT INTO events 
-                (title, description, date, location, latitude, longitude, 
-                 distance, type, url, source, source_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                event.get('title'),
-                event.get('description'),
-                event.get('date'),
-                event.get('location'),
-                event.get('latitude'),
-                event.get('longitude'),
-                event.get('distance'),
-                event.get('type'),
-                event.get('url'),
-                event.get('source'),
-                event.get('source_id')
-            ))
+        # Collect planner statistics after the first real insert
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if params and cursor.fetchone() is None:
+            cursor.execute('ANALYZE')
         
+        return rowcount
+
+def insert_event(event):
+    """Insert or update an event in the database"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(UPSERT_EVENT_SQL, _event_params(event))
         return cursor.lastrowid
 
+def _upcoming_events_query(has_min_date, has_max_date, has_type):
+    """Build the get_upcoming_events SQL for one combination of filters"""
+    query = '''
+        SELECT id, title, description, date, location, latitude, longitude,
+               distance, type, url, source, source_id
+        FROM events WHERE 1=1'''
+    
+    if has_min_date:
+        query += ' AND date >= ?'
+    else:
+        # Default: only future events
+        query += " AND date >= datetime('now')"
+    
+    if has_max_date:
+        query += ' AND date <= ?'
+    
+    if has_type:
+        query += ' AND type = ?'
+    
+    return query + ' ORDER BY date ASC LIMIT ?'
+
+# Built once so each filter combination always sends identical SQL text,
+# which is what sqlite3's per-connection statement cache is keyed on
+UPCOMING_EVENTS_QUERIES = {
+    (has_min_date, has_max_date, has_type): _upcoming_events_query(has_min_date, has_max_date, has_type)
+    for has_min_date in (False, True)
+    for has_max_date in (False, True)
+    for has_type in (False, True)
+}
+
 def get_upcoming_events(min_date=None, max_date=None, event_type=None, limit=100):
     """Get upcoming events from the database"""
     with get_db() as conn:
         cursor = conn.cursor()
         
-        query = 'SELECT * FROM events WHERE 1=1'
-        params = []
-        
-        if min_date:
-            query += ' AND date >= ?'
-            params.append(min_date)
-        else:
-            # Default: only future events
-            query += ' AND date >= datetime("now")'
-        
-        if max_date:
-            query += ' AND date <= ?'
-            params.append(max_date)
-        
-        if event_type:
-            query += ' AND type = ?'
-            params.append(event_type)
-        
-        query += ' ORDER BY date ASC LIMIT ?'
+        filters = (min_date, max_date, event_type)
+        query = UPCOMING_EVENTS_QUERIES[tuple(bool(value) for value in filters)]
+        params = [value for value in filters if value]
         params.append(limit)
         
         cursor.execute(query, params)
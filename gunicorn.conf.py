@@ -0,0 +1,36 @@
+"""
+Gunicorn settings for serving the Flask app in production
+Run with: gunicorn app:app
+"""
+import fcntl
+import threading
+
+bind = '0.0.0.0:5001'
+
+# /api/events is I/O-bound (SQLite reads), so threads give cheap concurrency
+workers = 2
+worker_class = 'gthread'
+threads = 8
+
+# Opened by the worker that runs the scheduler and held for its lifetime;
+# flock releases it when that worker exits, so another worker takes over
+SCHEDULER_LOCK_FILE = 'scheduler.lock'
+_scheduler_lock = None
+
+def _run_scheduler_when_locked():
+    """Block until this worker holds the scheduler lock, then start the scheduler"""
+    global _scheduler_lock
+    
+    lock_file = open(SCHEDULER_LOCK_FILE, 'w')
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    # Keep a reference: if the file object were collected the lock would be released
+    _scheduler_lock = lock_file
+    
+    from app import start_scheduler
+    start_scheduler()
+
+def post_worker_init(worker):
+    """Run the background scraper in exactly one worker, never in the master"""
+    # Every worker waits on the lock, so when the scheduler's worker exits
+    # (e.g. old workers being retired after a HUP) a live one picks it up
+    threading.Thread(target=_run_scheduler_when_locked, daemon=True).start()
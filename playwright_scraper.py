@@ -1,170 +1,209 @@
 """
 Playwright-based scraper for JavaScript-heavy websites
 """
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
-import time
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from types import MappingProxyType
+from playwright.async_api import async_playwright
 
-def scrape_with_playwright(url, wait_selector=None, wait_time=3):
+EVENTBRITE_URL = 'https://www.eventbrite.com/b/ny--brooklyn/music'
+MOMMY_POPPINS_URL = 'https://mommypoppins.com/new-york-city/brooklyn'
+MACARONI_KID_URL = 'https://brooklynnw.macaronikid.com'
+
+# CSS selectors for event listings ("i" makes attribute matches case-insensitive)
+EVENTBRITE_CARD_SELECTOR = 'div[class*="event" i], article[class*="event" i]'
+EVENTBRITE_TITLE_SELECTOR = 'h2[class*="title" i], h3[class*="title" i], h4[class*="title" i]'
+MACARONI_KID_LISTING_SELECTOR = (
+    'div[class*="event" i], div[class*="activity" i], '
+    'article[class*="event" i], article[class*="activity" i]'
+)
+
+# (url, card_selector, title_selector, wait_selector, wait_time) for each source
+EVENTBRITE_TARGET = (EVENTBRITE_URL, EVENTBRITE_CARD_SELECTOR, EVENTBRITE_TITLE_SELECTOR, '.event-card', 5)
+MOMMY_POPPINS_TARGET = (MOMMY_POPPINS_URL, 'article', 'h2, h3', 'article', 5)
+MACARONI_KID_TARGET = (MACARONI_KID_URL, MACARONI_KID_LISTING_SELECTOR, 'h2, h3, h4', None, 5)
+
+# Fields shared by every event from a source; builders only add title and source_id.
+# Read-only views, so a builder can't accidentally change the shared template
+EVENTBRITE_EVENT_TEMPLATE = MappingProxyType({
+    'description': 'Brooklyn music event from Eventbrite',
+    'date': None,  # Would need to parse date
+    'location': 'Brooklyn, NY',
+    'type': 'music',
+    'url': EVENTBRITE_URL,
+    'source': 'Eventbrite (Playwright)'
+})
+MOMMY_POPPINS_EVENT_TEMPLATE = MappingProxyType({
+    'description': 'Family-friendly event in Brooklyn',
+    'date': None,
+    'location': 'Brooklyn, NY',
+    'type': 'art',
+    'url': MOMMY_POPPINS_URL,
+    'source': 'Mommy Poppins (Playwright)'
+})
+MACARONI_KID_EVENT_TEMPLATE = MappingProxyType({
+    'description': 'Kids and family event in Brooklyn',
+    'date': None,
+    'location': 'Brooklyn, NY',
+    'type': 'art',
+    'url': MACARONI_KID_URL,
+    'source': 'Macaroni KID (Playwright)'
+})
+
+# Assets that don't affect the rendered DOM we read from
+BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font', 'stylesheet')
+
+# Runs in the page: text of the first title element in each card ('' if none)
+EXTRACT_TITLES_JS = '''(cards, titleSelector) => cards.map(card => {
+    const title = card.querySelector(titleSelector);
+    return title ? title.textContent.trim() : '';
+})'''
+
+def _source_id(prefix, title):
+    """Stable per-title ID; hash() is salted per process and breaks dedup across runs"""
+    return f'{prefix}_{hashlib.blake2b(title.encode(), digest_size=8).hexdigest()}'
+
+async def _block_assets(route):
+    """Abort requests for assets we don't need, let everything else through"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def scrape_one(browser, url, card_selector, title_selector, wait_selector=None, wait_time=3):
     """
-    Scrape a JavaScript-heavy website using Playwright
+    Scrape card titles from a JavaScript-heavy website in its own browser context
     
     Args:
+        browser: Playwright browser shared between scrapes
         url: URL to scrape
+        card_selector: CSS selector matching one element per event
+        title_selector: CSS selector for the title inside each card
         wait_selector: CSS selector to wait for (optional)
         wait_time: Time to wait if no selector provided (default: 3 seconds)
     
     Returns:
-        BeautifulSoup object with parsed HTML
+        List of title strings in card order, or None if scraping failed
     """
-    with sync_playwright() as p:
+    # Separate contexts keep cookies and storage isolated per site
+    context = await browser.new_context()
+    await context.route('**/*', _block_assets)
+    page = await context.new_page()
+    
+    try:
+        # Navigate to the page
+        await page.goto(url, wait_until='networkidle', timeout=30000)
+        
+        # Wait for specific content or fixed time
+        if wait_selector:
+            try:
+                await page.wait_for_selector(wait_selector, timeout=10000)
+            except:
+                print(f"Warning: Selector '{wait_selector}' not found")
+        else:
+            await asyncio.sleep(wait_time)
+        
+        # Read titles straight from the live DOM instead of re-parsing page.content()
+        return await page.locator(card_selector).evaluate_all(EXTRACT_TITLES_JS, title_selector)
+        
+    except Exception as e:
+        print(f"Error during Playwright scraping: {e}")
+        return None
+        
+    finally:
+        await context.close()
+
+@asynccontextmanager
+async def shared_browser():
+    """Launch one headless Chromium to be shared by concurrent scrapes"""
+    async with async_playwright() as p:
         # Launch browser in headless mode
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+        browser = await p.chromium.launch(headless=True)
         
         try:
-            # Navigate to the page
-            page.goto(url, wait_until='networkidle', timeout=30000)
-            
-            # Wait for specific content or fixed time
-            if wait_selector:
-                try:
-                    page.wait_for_selector(wait_selector, timeout=10000)
-                except:
-                    print(f"Warning: Selector '{wait_selector}' not found")
-            else:
-                time.sleep(wait_time)
-            
-            # Get the fully rendered HTML
-            content = page.content()
-            
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            return soup
-            
-        except Exception as e:
-            print(f"Error during Playwright scraping: {e}")
-            return None
-            
+            yield browser
         finally:
-            browser.close()
+            await browser.close()
 
-def scrape_eventbrite_with_playwright():
-    """Scrape Eventbrite Brooklyn events using Playwright"""
+def _eventbrite_events(titles):
+    """Build events from Eventbrite card titles"""
     events = []
     
-    try:
-        url = 'https://www.eventbrite.com/b/ny--brooklyn/music'
-        soup = scrape_with_playwright(url, wait_selector='.event-card', wait_time=5)
-        
-        if soup:
-            # Look for event cards (structure may vary)
-            event_cards = soup.find_all(['div', 'article'], class_=lambda x: x and 'event' in x.lower())
-            
-            print(f"Found {len(event_cards)} potential event cards")
-            
-            # Extract event data (adjust selectors based on actual HTML structure)
-            for card in event_cards[:5]:  # Limit to 5 events for now
-                title_elem = card.find(['h2', 'h3', 'h4'], class_=lambda x: x and 'title' in str(x).lower())
-                title = title_elem.get_text(strip=True) if title_elem else None
-                
-                if title:
-                    events.append({
-                        'title': title,
-                        'description': 'Brooklyn music event from Eventbrite',
-                        'date': None,  # Would need to parse date
-                        'location': 'Brooklyn, NY',
-                        'type': 'music',
-                        'url': url,
-                        'source': 'Eventbrite (Playwright)',
-                        'source_id': f'eventbrite_{hash(title)}'
-                    })
+    if titles:
+        print(f"Found {len(titles)} potential event cards")
         
-    except Exception as e:
-        print(f"Error scraping Eventbrite with Playwright: {e}")
+        for title in titles[:5]:  # Limit to 5 events for now
+            if title:
+                events.append({
+                    **EVENTBRITE_EVENT_TEMPLATE,
+                    'title': title,
+                    'source_id': _source_id('eventbrite', title)
+                })
     
     return events
 
-def scrape_mommy_poppins_with_playwright():
-    """Scrape Mommy Poppins events using Playwright"""
+def _mommy_poppins_events(titles):
+    """Build events from Mommy Poppins article titles"""
     events = []
     
-    try:
-        url = 'https://mommypoppins.com/new-york-city/brooklyn'
-        soup = scrape_with_playwright(url, wait_selector='article', wait_time=5)
-        
-        if soup:
-            # Look for articles or event listings
-            articles = soup.find_all('article', limit=5)
-            
-            for article in articles:
-                title_elem = article.find(['h2', 'h3'])
-                title = title_elem.get_text(strip=True) if title_elem else None
-                
-                if title:
-                    events.append({
-                        'title': title,
-                        'description': 'Family-friendly event in Brooklyn',
-                        'date': None,
-                        'location': 'Brooklyn, NY',
-                        'type': 'art',
-                        'url': url,
-                        'source': 'Mommy Poppins (Playwright)',
-                        'source_id': f'mommypoppins_{hash(title)}'
-                    })
-        
-    except Exception as e:
-        print(f"Error scraping Mommy Poppins with Playwright: {e}")
+    if titles:
+        for title in titles[:5]:  # Limit to 5 events for now
+            if title:
+                events.append({
+                    **MOMMY_POPPINS_EVENT_TEMPLATE,
+                    'title': title,
+                    'source_id': _source_id('mommypoppins', title)
+                })
     
     return events
 
-def scrape_macaroni_kid_with_playwright():
-    """Scrape Macaroni KID Brooklyn events using Playwright"""
+def _macaroni_kid_events(titles):
+    """Build events from Macaroni KID listing titles"""
     events = []
     
-    try:
-        url = 'https://brooklynnw.macaronikid.com'
-        soup = scrape_with_playwright(url, wait_time=5)
-        
-        if soup:
-            # Look for event listings
-            listings = soup.find_all(['div', 'article'], class_=lambda x: x and ('event' in str(x).lower() or 'activity' in str(x).lower()), limit=5)
-            
-            for listing in listings:
-                title_elem = listing.find(['h2', 'h3', 'h4'])
-                title = title_elem.get_text(strip=True) if title_elem else None
-                
-                if title:
-                    events.append({
-                        'title': title,
-                        'description': 'Kids and family event in Brooklyn',
-                        'date': None,
-                        'location': 'Brooklyn, NY',
-                        'type': 'art',
-                        'url': url,
-                        'source': 'Macaroni KID (Playwright)',
-                        'source_id': f'macaronikid_{hash(title)}'
-                    })
-        
-    except Exception as e:
-        print(f"Error scraping Macaroni KID with Playwright: {e}")
+    if titles:
+        for title in titles[:5]:  # Limit to 5 events for now
+            if title:
+                events.append({
+                    **MACARONI_KID_EVENT_TEMPLATE,
+                    'title': title,
+                    'source_id': _source_id('macaronikid', title)
+                })
     
     return events
 
+async def scrape_eventbrite_with_playwright(browser):
+    """Scrape Eventbrite Brooklyn events using Playwright"""
+    titles = await scrape_one(browser, *EVENTBRITE_TARGET)
+    return _eventbrite_events(titles)
+
+async def scrape_mommy_poppins_with_playwright(browser):
+    """Scrape Mommy Poppins events using Playwright"""
+    titles = await scrape_one(browser, *MOMMY_POPPINS_TARGET)
+    return _mommy_poppins_events(titles)
+
+async def scrape_macaroni_kid_with_playwright(browser):
+    """Scrape Macaroni KID Brooklyn events using Playwright"""
+    titles = await scrape_one(browser, *MACARONI_KID_TARGET)
+    return _macaroni_kid_events(titles)
+
+async def _test_scrapers():
+    """Run each Playwright scraper against one shared browser and report counts"""
+    async with shared_browser() as browser:
+        print("\n1. Testing Eventbrite:")
+        eventbrite_events = await scrape_eventbrite_with_playwright(browser)
+        print(f"Found {len(eventbrite_events)} events")
+        
+        print("\n2. Testing Mommy Poppins:")
+        mommy_events = await scrape_mommy_poppins_with_playwright(browser)
+        print(f"Found {len(mommy_events)} events")
+        
+        print("\n3. Testing Macaroni KID:")
+        macaroni_events = await scrape_macaroni_kid_with_playwright(browser)
+        print(f"Found {len(macaroni_events)} events")
+
 if __name__ == '__main__':
     # Test Playwright scraping
     print("Testing Playwright scraping...")
-    
-    print("\n1. Testing Eventbrite:")
-    eventbrite_events = scrape_eventbrite_with_playwright()
-    print(f"Found {len(eventbrite_events)} events")
-    
-    print("\n2. Testing Mommy Poppins:")
-    mommy_events = scrape_mommy_poppins_with_playwright()
-    print(f"Found {len(mommy_events)} events")
-    
-    print("\n3. Testing Macaroni KID:")
-    macaroni_events = scrape_macaroni_kid_with_playwright()
-    print(f"Found {len(macaroni_events)} events")
-
+    asyncio.run(_test_scrapers())
@@ -5,11 +5,11 @@ Run this as a scheduled task (cron) or separate service
 import sys
 from datetime import datetime
 from scrapers import scrape_all_sources
-from database import insert_event, log_scraping_run, init_db
+from database import insert_events_bulk, log_scraping_run, init_db
 import traceback
 
 def run_scraper():
-    """Run the scraper and save results to database"""
+    """Run the scraper and save results to database; returns True on success"""
     print(f"Starting scraper run at {datetime.now()}")
     
     # Initialize database if needed
@@ -20,18 +20,14 @@ def run_scraper():
         all_events = scrape_all_sources()
         print(f"Scraped {len(all_events)} events total")
         
-        events_added = 0
         for event in all_events:
-            try:
-                # Generate a unique source_id if not present
-                if 'source_id' not in event:
-                    event['source_id'] = f"{event.get('title', '')}_{event.get('date', '')}"
-                
-                insert_event(event)
-                events_added += 1
-            except Exception as e:
-                print(f"Error inserting event: {e}")
-                print(f"Event: {event.get('title', 'Unknown')}")
+            # Generate a unique source_id if not present
+            if 'source_id' not in event:
+                event['source_id'] = f"{event.get('title', '')}_{event.get('date', '')}"
+        
+        # One transaction (and one commit) for the whole batch; events
+        # missing required fields are skipped rather than failing the run
+        events_added = insert_events_bulk(all_events)
         
         # Log successful run
         log_scraping_run(
@@ -42,6 +38,7 @@ def run_scraper():
         )
         
         print(f"Successfully added {events_added} events to database")
+        return True
         
     except Exception as e:
         error_msg = traceback.format_exc()
@@ -56,8 +53,9 @@ def run_scraper():
             error_message=str(e)
         )
         
-        sys.exit(1)
+        return False
 
 if __name__ == '__main__':
-    run_scraper()
+    if not run_scraper():
+        sys.exit(1)
 
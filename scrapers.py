@@ -1,16 +1,84 @@
 """
 Web scrapers for various Brooklyn event sources
 """
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import os
+import diskcache
+import httpx
+import ahocorasick
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
+from datetime import date, datetime, timedelta
 import re
-import json
+import orjson
+from functools import lru_cache, wraps
+import numpy as np
 from playwright_scraper import (
     scrape_eventbrite_with_playwright,
     scrape_mommy_poppins_with_playwright,
-    scrape_macaroni_kid_with_playwright
+    scrape_macaroni_kid_with_playwright,
+    shared_browser
 )
+from utils_geo import haversine_vector
+
+# Set SCRAPER_CACHE_DIR (e.g. ./.scraper_cache) during development to reuse
+# each source's results for the rest of the day instead of re-fetching
+SCRAPER_CACHE_DIR = os.environ.get('SCRAPER_CACHE_DIR')
+_scraper_cache = diskcache.Cache(SCRAPER_CACHE_DIR) if SCRAPER_CACHE_DIR else None
+
+# Sentinel for cache misses, distinct from any cached value
+_MISS = object()
+
+def _daily_cache_key(scraper):
+    """Cache key for a scraper's results today"""
+    return hashlib.blake2b(f'{scraper.__name__}|{date.today()}'.encode()).hexdigest()
+
+def _cached_today(scraper):
+    """Return a scraper's cached results for today, or _MISS"""
+    if _scraper_cache is None:
+        return _MISS
+    # One lookup, so an entry expiring mid-check can't raise KeyError
+    return _scraper_cache.get(_daily_cache_key(scraper), default=_MISS)
+
+def cached_daily(scraper):
+    """Reuse a scraper's results for the rest of the day when SCRAPER_CACHE_DIR is set"""
+    @wraps(scraper)
+    async def wrapper(*args):
+        events = _cached_today(scraper)
+        if events is not _MISS:
+            return events
+        
+        events = await scraper(*args)
+        # Scrapers return [] on errors too, so don't pin an empty result for the day
+        if events and _scraper_cache is not None:
+            _scraper_cache.set(_daily_cache_key(scraper), events, expire=24 * 60 * 60)
+        return events
+    
+    return wrapper
+
+# Sent with every request; set once on the shared client
+_DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Upper bound on in-flight HTTP requests across all scrapers, to stay polite to the sites
+MAX_CONCURRENT_REQUESTS = 8
+
+async def _fetch(sem, client, url):
+    """GET a URL once a slot under the shared semaphore is free"""
+    async with sem:
+        return await client.get(url)
+
+# Class-name patterns for event listings, compiled once at import
+_EVENT_CLASS_RE = re.compile(r'event|listing|card', re.I)
+_EXHIBIT_CLASS_RE = re.compile(r'exhibition|show|event', re.I)
+_CONCERT_CLASS_RE = re.compile(r'concert|event|show', re.I)
+
+# Parse-time filters so the tree only holds candidate listing nodes
+_EVENT_STRAINER = SoupStrainer(['article', 'div'], class_=_EVENT_CLASS_RE)
+_EXHIBIT_STRAINER = SoupStrainer(['article', 'div'], class_=_EXHIBIT_CLASS_RE)
+_CONCERT_STRAINER = SoupStrainer(['div', 'article'], class_=_CONCERT_CLASS_RE)
 
 # Prospect Heights coordinates for distance calculation
 PROSPECT_HEIGHTS = {
@@ -18,109 +86,137 @@ PROSPECT_HEIGHTS = {
     'lng': -73.9712
 }
 
-def calculate_distance(lat1, lng1, lat2, lng2):
-    """Calculate distance between two coordinates using Haversine formula"""
-    from math import radians, sin, cos, sqrt, atan2
-    
-    R = 3959  # Earth's radius in miles
-    
-    lat1_rad = radians(lat1)
-    lat2_rad = radians(lat2)
-    delta_lat = radians(lat2 - lat1)
-    delta_lng = radians(lng2 - lng1)
-    
-    a = sin(delta_lat/2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(delta_lng/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    
-    return R * c
+# Approximate coordinates for known Brooklyn locations, in match priority order.
+# Keys are lowercase; a tuple of pairs so the table can't be mutated at runtime
+BROOKLYN_LOCATIONS = (
+    ('prospect park', (40.6627, -73.9700)),
+    ('williamsburg', (40.7081, -73.9571)),
+    ('park slope', (40.6782, -73.9840)),
+    ('prospect heights', (40.6782, -73.9712)),
+    ('brooklyn museum', (40.6712, -73.9642)),
+    ('brooklyn children\'s museum', (40.6694, -73.9479)),
+    ('brooklyn bridge park', (40.6981, -73.9969)),
+    ('red hook', (40.6773, -74.0106)),
+    ('flatbush', (40.6529, -73.9497)),
+    ('gowanus', (40.6779, -73.9897)),
+    ('fort greene', (40.6915, -73.9759)),
+    ('crown heights', (40.6697, -73.9442)),
+    ('dumbo', (40.7033, -73.9878)),
+    ('carroll gardens', (40.6795, -73.9996)),
+    ('boerum hill', (40.6865, -73.9807)),
+)
 
+# One automaton over every key, so a single scan of the text finds all matches
+_GEOCODE_AC = ahocorasick.Automaton()
+for priority, (key, coords) in enumerate(BROOKLYN_LOCATIONS):
+    _GEOCODE_AC.add_word(key, (priority, coords))
+_GEOCODE_AC.make_automaton()
+
+@lru_cache(maxsize=1024)
 def geocode_location(location_text):
     """
     Simple geocoding using approximate coordinates for Brooklyn locations
     In production, use Google Maps API or similar
     """
-    brooklyn_locations = {
-        'prospect park': (40.6627, -73.9700),
-        'williamsburg': (40.7081, -73.9571),
-        'park slope': (40.6782, -73.9840),
-        'prospect heights': (40.6782, -73.9712),
-        'brooklyn museum': (40.6712, -73.9642),
-        'brooklyn children\'s museum': (40.6694, -73.9479),
-        'brooklyn bridge park': (40.6981, -73.9969),
-        'red hook': (40.6773, -74.0106),
-        'flatbush': (40.6529, -73.9497),
-        'gowanus': (40.6779, -73.9897),
-        'fort greene': (40.6915, -73.9759),
-        'crown heights': (40.6697, -73.9442),
-        'dumbo': (40.7033, -73.9878),
-        'carroll gardens': (40.6795, -73.9996),
-        'boerum hill': (40.6865, -73.9807),
-    }
-    
-    location_lower = location_text.lower()
-    for key, coords in brooklyn_locations.items():
-        if key in location_lower:
-            return coords
+    # Earliest key in BROOKLYN_LOCATIONS wins, same as checking them in order;
+    # lru_cache means each distinct location is only casefolded once
+    match = min((value for _, value in _GEOCODE_AC.iter(location_text.casefold())), default=None)
+    if match:
+        return match[1]
     
     # Default to Prospect Heights if not found
     return PROSPECT_HEIGHTS['lat'], PROSPECT_HEIGHTS['lng']
 
-def scrape_brooklyn_paper_events():
+@cached_daily
+async def scrape_brooklyn_paper_events(sem, client):
     """Scrape events from Brooklyn Paper"""
     events = []
     
     try:
         url = 'https://events.brooklynpaper.com'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await _fetch(sem, client, url)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
+            soup = BeautifulSoup(response.content, 'lxml', parse_only=_EVENT_STRAINER)
+        
             # Try to find event listings (structure may vary)
-            event_cards = soup.find_all(['article', 'div'], class_=re.compile(r'event|listing|card', re.I))
-            
+            event_cards = soup.find_all(['article', 'div'], class_=_EVENT_CLASS_RE)
+        
             # TODO: Parse actual event data from HTML
-            
+        
     except Exception as e:
         print(f"Error scraping Brooklyn Paper: {e}")
     
     return events
 
-def scrape_brooklyn_library_events():
+class _JsonLdCollector:
+    """lxml parser target that keeps only JSON-LD script text, so no tree is built"""
+    
+    def __init__(self):
+        self.scripts = []
+        self._chunks = None
+    
+    def start(self, tag, attrib):
+        if tag == 'script' and attrib.get('type') == 'application/ld+json':
+            self._chunks = []
+    
+    def end(self, tag):
+        if tag == 'script' and self._chunks is not None:
+            text = ''.join(self._chunks)
+            if text:
+                self.scripts.append(text)
+            self._chunks = None
+    
+    def data(self, data):
+        if self._chunks is not None:
+            self._chunks.append(data)
+    
+    def close(self):
+        return self.scripts
+
+@cached_daily
+async def scrape_brooklyn_library_events(sem, client):
     """Scrape events from Brooklyn Public Library"""
     events = []
     
     try:
         # Brooklyn Library uses dynamic content, try to find JSON-LD or API endpoints
         url = 'https://www.bklynlibrary.org/event-series'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
         
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Try to extract JSON-LD structured data
-            json_scripts = soup.find_all('script', type='application/ld+json')
-            
-            # TODO: Parse JSON-LD data or use Playwright for dynamic content
+        async with sem, client.stream('GET', url) as response:
+            if response.status_code == 200:
+                # Parse chunks as they arrive instead of buffering the whole page;
+                # the target only keeps JSON-LD text, the rest of the DOM is never built
+                parser = etree.HTMLParser(target=_JsonLdCollector())
+                
+                async for chunk in response.aiter_bytes(16384):
+                    parser.feed(chunk)
                 
+                json_scripts = parser.close()
+                
+                # Decode the structured data, skipping malformed blocks
+                json_ld = []
+                for script in json_scripts:
+                    try:
+                        json_ld.append(orjson.loads(script))
+                    except orjson.JSONDecodeError:
+                        continue
+                
+                # TODO: Map JSON-LD Event data to events or use Playwright for dynamic content
+            
     except Exception as e:
         print(f"Error scraping Brooklyn Library: {e}")
     
     return events
 
-def scrape_eventbrite_music():
+@cached_daily
+async def scrape_eventbrite_music(browser):
     """Scrape music events from Eventbrite using Playwright"""
     events = []
     
     try:
         # Use Playwright for JavaScript-heavy Eventbrite
-        playwright_events = scrape_eventbrite_with_playwright()
+        playwright_events = await scrape_eventbrite_with_playwright(browser)
         events.extend(playwright_events)
                 
     except Exception as e:
@@ -128,61 +224,58 @@ def scrape_eventbrite_music():
     
     return events
 
-def scrape_wagmag_art():
+@cached_daily
+async def scrape_wagmag_art(sem, client):
     """Scrape art events from WAGMAG"""
     events = []
     
     try:
         url = 'https://wagmag.org'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await _fetch(sem, client, url)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
+            soup = BeautifulSoup(response.content, 'lxml', parse_only=_EXHIBIT_STRAINER)
+        
             # Try to find exhibition listings
-            exhibitions = soup.find_all(['article', 'div'], class_=re.compile(r'exhibition|show|event', re.I))
-            
+            exhibitions = soup.find_all(['article', 'div'], class_=_EXHIBIT_CLASS_RE)
+        
             # TODO: Parse actual exhibition data from HTML
-                
+            
     except Exception as e:
         print(f"Error scraping WAGMAG: {e}")
     
     return events
 
-def scrape_bargemusic():
+@cached_daily
+async def scrape_bargemusic(sem, client):
     """Scrape events from Bargemusic"""
     events = []
     
     try:
         url = 'https://bargemusic.org'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await _fetch(sem, client, url)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
+            soup = BeautifulSoup(response.content, 'lxml', parse_only=_CONCERT_STRAINER)
+        
             # Look for upcoming concerts
-            concerts = soup.find_all(['div', 'article'], class_=re.compile(r'concert|event|show', re.I))
-            
+            concerts = soup.find_all(['div', 'article'], class_=_CONCERT_CLASS_RE)
+        
             # TODO: Parse actual concert data from HTML
-                
+            
     except Exception as e:
         print(f"Error scraping Bargemusic: {e}")
     
     return events
 
-def scrape_mommy_poppins():
+@cached_daily
+async def scrape_mommy_poppins(browser):
     """Scrape events from Mommy Poppins Brooklyn using Playwright"""
     events = []
     
     try:
         # Use Playwright for JavaScript-heavy Mommy Poppins
-        playwright_events = scrape_mommy_poppins_with_playwright()
+        playwright_events = await scrape_mommy_poppins_with_playwright(browser)
         events.extend(playwright_events)
                 
     except Exception as e:
@@ -190,13 +283,14 @@ def scrape_mommy_poppins():
     
     return events
 
-def scrape_macaroni_kid():
+@cached_daily
+async def scrape_macaroni_kid(browser):
     """Scrape events from Macaroni KID Brooklyn using Playwright"""
     events = []
     
     try:
         # Use Playwright for JavaScript-heavy Macaroni KID
-        playwright_events = scrape_macaroni_kid_with_playwright()
+        playwright_events = await scrape_macaroni_kid_with_playwright(browser)
         events.extend(playwright_events)
                 
     except Exception as e:
@@ -204,26 +298,59 @@ def scrape_macaroni_kid():
     
     return events
 
+PLAYWRIGHT_SCRAPERS = (scrape_eventbrite_music, scrape_mommy_poppins, scrape_macaroni_kid)
+
+async def scrape_playwright_sources():
+    """Scrape Eventbrite, Mommy Poppins and Macaroni KID concurrently in one browser"""
+    # Don't launch Chromium at all when every source is already cached for today
+    cached = [_cached_today(scraper) for scraper in PLAYWRIGHT_SCRAPERS]
+    if all(events is not _MISS for events in cached):
+        return [event for events in cached for event in events]
+    
+    try:
+        async with shared_browser() as browser:
+            results = await asyncio.gather(*(scraper(browser) for scraper in PLAYWRIGHT_SCRAPERS))
+    except Exception as e:
+        print(f"Error scraping with Playwright: {e}")
+        return []
+    
+    return [event for events in results for event in events]
+
+async def _scrape_all_async():
+    """Run all scrapers concurrently over one shared HTTP client"""
+    # Pooled keep-alive (and HTTP/2 where supported) connections shared by every scraper
+    limits = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+    # Created here so it binds to the loop asyncio.run() starts
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    # Follow redirects (apex -> www, http -> https) like requests did
+    async with httpx.AsyncClient(
+        http2=True, timeout=10.0, limits=limits,
+        headers=_DEFAULT_HEADERS, follow_redirects=True
+    ) as client:
+        results = await asyncio.gather(
+            scrape_brooklyn_paper_events(sem, client),
+            scrape_brooklyn_library_events(sem, client),
+            scrape_wagmag_art(sem, client),
+            scrape_bargemusic(sem, client),
+            # JavaScript-heavy sources share one browser
+            scrape_playwright_sources()
+        )
+    
+    return [event for events in results for event in events]
+
 def scrape_all_sources():
     """Scrape events from all sources"""
-    all_events = []
-    
-    # Scrape from different sources
-    all_events.extend(scrape_brooklyn_paper_events())
-    all_events.extend(scrape_brooklyn_library_events())
-    all_events.extend(scrape_eventbrite_music())
-    all_events.extend(scrape_wagmag_art())
-    all_events.extend(scrape_bargemusic())
-    all_events.extend(scrape_mommy_poppins())
-    all_events.extend(scrape_macaroni_kid())
-    
-    # Add distance to each event
-    for event in all_events:
-        lat, lng = geocode_location(event['location'])
-        event['distance'] = calculate_distance(
-            PROSPECT_HEIGHTS['lat'], PROSPECT_HEIGHTS['lng'],
-            lat, lng
-        )
+    all_events = asyncio.run(_scrape_all_async())
+    
+    # Add distance to each event in one vectorized pass
+    lats = np.empty(len(all_events), dtype=np.float64)
+    lngs = np.empty(len(all_events), dtype=np.float64)
+    for i, event in enumerate(all_events):
+        lats[i], lngs[i] = geocode_location(event['location'])
+    
+    distances = haversine_vector(PROSPECT_HEIGHTS['lat'], PROSPECT_HEIGHTS['lng'], lats, lngs)
+    for event, distance in zip(all_events, distances.tolist()):
+        event['distance'] = distance
     
     return all_events
 
@@ -0,0 +1,40 @@
+"""
+Geographic helpers for annotating events with distances
+"""
+from math import radians, sin, cos, sqrt, atan2
+import numpy as np
+from numba import njit, prange
+
+EARTH_RADIUS_MILES = 3959
+
+@njit(parallel=True, fastmath=True, cache=True)
+def haversine_bulk(lat1, lng1, lats, lngs, out):
+    """
+    Fill `out` with Haversine distances (miles) from one point to many
+
+    All inputs are in radians. Kept free of degree handling so the whole
+    computation fuses into a single parallel loop.
+    """
+    cos_lat1 = cos(lat1)
+    for i in prange(lats.shape[0]):
+        dlat = lats[i] - lat1
+        dlng = lngs[i] - lng1
+        a = sin(dlat*0.5)**2 + cos_lat1 * cos(lats[i]) * sin(dlng*0.5)**2
+        out[i] = 2 * EARTH_RADIUS_MILES * atan2(sqrt(a), sqrt(1 - a))
+
+def haversine_vector(lat1, lng1, lats, lngs):
+    """
+    Vectorized Haversine distance from one point to many locations
+
+    Args:
+        lat1, lng1: Coordinates of the origin (degrees)
+        lats, lngs: Float64 arrays of location coordinates (degrees)
+
+    Returns:
+        Array of distances in miles, same length as lats
+    """
+    lats_rad = np.radians(lats)
+    lngs_rad = np.radians(lngs)
+    out = np.empty_like(lats_rad)
+    haversine_bulk(radians(lat1), radians(lng1), lats_rad, lngs_rad, out)
+    return out